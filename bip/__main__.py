@@ -1,10 +1,12 @@
 import os
+from itertools import chain, islice
 from colorama import just_fix_windows_console as fix_windows_console
 from pathlib import Path
 from typing import Optional
 
 import bip.cli as cli
 import bip.lang.c as C
+import bip.objcache as objcache
 
 from .component.abc import RunInfo
 from .recipe import Recipe
@@ -18,18 +20,21 @@ Where <action> can be:
     clean -> remove all build artifacts
 Where [options...] can be:
     --recipe=<name> -> specify name of recipe file (default `recipe.toml`)
+    --no-cache -> do not use the object cache or a compiler cache
+    --verbose -> show which source files are compiled or reused
 """.strip()
 
 MAX_RECIPE_SEARCH_DEPTH = 5
 
 
+# Look for the recipe file in the current directory and its parents.
 def _find_recipe_file(filename: str) -> Optional[Path]:
-    path = Path(filename).resolve()
-    for i in range(MAX_RECIPE_SEARCH_DEPTH):
+    cwd = Path.cwd()
+    for parent in islice(chain((cwd,), cwd.parents), MAX_RECIPE_SEARCH_DEPTH):
+        path = parent / filename
         if path.exists():
             # print(f"recipe file is {path}")
-            return path
-        path = path.parent.parent / filename
+            return path.resolve()
     return None
 
 def main(args: list[str]) -> int:
@@ -63,8 +68,11 @@ def main(args: list[str]) -> int:
         print(USAGE % args.program)
         return 1
 
+    cli.VERBOSE = "verbose" in args.flags
+
     is_release = any((x in args.flags for x in ("o", "opt", "r", "rel", "release")))
-    info = RunInfo(is_release)
+    use_cache = "no-cache" not in args.flags
+    info = RunInfo(is_release, use_cache)
 
     recipe = Recipe.load(recipe_path, info)
     if recipe is None:
@@ -87,6 +95,7 @@ def main(args: list[str]) -> int:
                 if c.want_run():
                     if not c.run(info):
                         return 3
+            objcache.trim()
             return 0
         case _:
             print(USAGE % args.program)
@@ -2,13 +2,17 @@
 Command-line argument parsing & terminal output.
 """
 
-import subprocess
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
+# subprocess is imported where commands are run, so that actions which never run
+# one (such as `check`) do not pay for importing it.
+if TYPE_CHECKING:
+    import subprocess
 
-@dataclass
+
+@dataclass(slots=True)
 class Args:
     # Name of the invoked program.
     program: str
@@ -21,7 +25,8 @@ class Args:
 
 
 def _find_either(s: str, a: str, b: str) -> int:
-    if idx := s.find(a):
+    idx = s.find(a)
+    if idx != -1:
         return idx
     return s.find(b)
 
@@ -33,11 +38,13 @@ def parse(args: list[str]) -> Args:
     named: dict[str, str] = {}
     if len(args) < 2:
         return Args(program, pos, flags, named)
+    add_pos = pos.append
+    add_flag = flags.append
     for a in args[1:]:
-        if a.startswith("--"):
+        if a[:2] == "--":
             val_idx = _find_either(a, "=", ":")
             if val_idx == -1:
-                flags.append(a[2:].lower())
+                add_flag(a[2:].lower())
             else:
                 named[a[2:val_idx].lower()] = a[val_idx + 1 :].lower()
         # elif a.startswith("/"):
@@ -46,13 +53,17 @@ def parse(args: list[str]) -> Args:
         #         flags.append(a[1:])
         #     else:
         #         named[a[1:val_idx]] = a[val_idx + 1 :]
-        elif a.startswith("-"):
-            flags.append(a[1:].lower())
+        elif a[:1] == "-":
+            add_flag(a[1:].lower())
         else:
-            pos.append(a.lower())
+            add_pos(a.lower())
     return Args(program, pos, flags, named)
 
 
+# Print detailed information about what is being done. Set by `--verbose`.
+VERBOSE = False
+
+
 BOLD = "\x1b[1m"
 NO_BOLD = "\x1b[22m"
 
@@ -74,7 +85,14 @@ def note(text: str, tip: Optional[str] = None) -> None:
     message(" note", CYAN, text, tip)
 
 
+# Warnings are also appended here while it is set, so that they can be shown
+# again later. Used to replay the warnings of a recipe loaded from the cache.
+RECORDED_WARNINGS: Optional[list[tuple[str, Optional[str]]]] = None
+
+
 def warn(text: str, tip: Optional[str] = None) -> None:
+    if RECORDED_WARNINGS is not None:
+        RECORDED_WARNINGS.append((text, tip))
     message(" warn", YELLOW, text, tip)
 
 
@@ -112,14 +130,24 @@ def join(args: list[str]) -> str:
     return " ".join(quote(a) for a in args)
 
 
-# Run a command
+# Run a command. It is run directly rather than through a shell, so nothing in
+# `exe` or `args` is expanded. Returns False if it failed or could not be run.
 def cmd(exe: str, args: list[str]) -> bool:
-    full = join([exe, *args])
-    # print(full)
-    return subprocess.run(full, shell=True).returncode == 0
+    import subprocess
+
+    # print(join([exe, *args]))
+    try:
+        return subprocess.run([exe, *args]).returncode == 0
+    except OSError as e:
+        _cannot_run(exe, e)
+        return False
+
+
+def _cannot_run(exe: str, e: OSError) -> None:
+    error(f"Could not run {exe}: {e.strerror or e}")
 
 
-@dataclass
+@dataclass(slots=True)
 class CmdOut:
     success: bool
     stdout: bytes
@@ -127,10 +155,64 @@ class CmdOut:
 
 
 def cmd_out(exe: str, args: list[str]) -> CmdOut:
-    full = join([exe, *args])
-    # print(full)
-    res = subprocess.run(full, shell=True, capture_output=True)
-    return CmdOut(res.returncode == 0, res.stdout, res.stderr)
+    proc = spawn(exe, args)
+    if proc is None:
+        return CmdOut(False, b"", b"")
+    return reap(proc)
+
+
+# Start a command in the background, capturing its output. Use reap() to wait
+# for it to finish. Returns None if it could not be started.
+def spawn(exe: str, args: list[str]) -> Optional["subprocess.Popen"]:
+    import subprocess
+
+    # print(join([exe, *args]))
+    try:
+        return subprocess.Popen(
+            [exe, *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except OSError as e:
+        _cannot_run(exe, e)
+        return None
+
+
+# Wait for a command started with spawn() to finish.
+def reap(proc: "subprocess.Popen") -> CmdOut:
+    stdout, stderr = proc.communicate()
+    return CmdOut(proc.returncode == 0, stdout, stderr)
+
+
+# Start a command in the background with its stdout and stderr merged into one
+# pipe. Use stream() to show its output and wait for it to finish. Returns None
+# if it could not be started.
+def spawn_merged(exe: str, args: list[str]) -> Optional["subprocess.Popen"]:
+    import subprocess
+
+    # print(join([exe, *args]))
+    try:
+        return subprocess.Popen(
+            [exe, *args], stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+    except OSError as e:
+        _cannot_run(exe, e)
+        return None
+
+
+# Print the output of a command started with spawn_merged() as it is written,
+# then wait for it to finish. Returns whether it succeeded. If `output` is given,
+# the printed lines are also appended to it.
+def stream(
+    indent: int, proc: "subprocess.Popen", output: Optional[list[bytes]] = None
+) -> bool:
+    with proc.stdout:
+        for line in proc.stdout:
+            # blank lines are dropped before anything is decoded
+            line = line.rstrip()
+            if line:
+                if output is not None:
+                    output.append(line)
+                wrapped(indent, line.decode("utf-8", "replace"))
+    return proc.wait() == 0
 
 
 def wrapped(indent: int, text: str):
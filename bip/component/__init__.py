@@ -4,7 +4,7 @@ Component definitions.
 
 
 from enum import StrEnum
-from typing import Optional
+from typing import Callable, Optional
 
 import bip.cli as cli
 import bip.lang as lang
@@ -23,6 +23,55 @@ class Kind(StrEnum):
     PLUG = "plug"
 
 
+# Kind of component for each key that may name one, in order of precedence.
+KIND_KEYS = {k.value: k for k in Kind}
+
+
+def _exe_from_dict(
+    raw: dict,
+    name: str,
+    out_name: str,
+    platcond: Optional[plat.ID],
+    base_paths: Paths,
+    lang_config: lang.MultiConfig,
+) -> Optional[Component]:
+    return ExeOrLibComponent.from_dict(
+        raw, name, out_name, platcond, False, base_paths, lang_config
+    )
+
+
+def _lib_from_dict(
+    raw: dict,
+    name: str,
+    out_name: str,
+    platcond: Optional[plat.ID],
+    base_paths: Paths,
+    lang_config: lang.MultiConfig,
+) -> Optional[Component]:
+    return ExeOrLibComponent.from_dict(
+        raw, name, out_name, platcond, True, base_paths, lang_config
+    )
+
+
+def _plug_from_dict(
+    raw: dict,
+    name: str,
+    out_name: str,
+    platcond: Optional[plat.ID],
+    base_paths: Paths,
+    lang_config: lang.MultiConfig,
+) -> Optional[Component]:
+    return PlugComponent.from_dict(raw, name, out_name, platcond, base_paths)
+
+
+# Function creating each kind of component from the rest of its dictionary.
+FACTORIES: dict[Kind, Callable[..., Optional[Component]]] = {
+    Kind.EXE: _exe_from_dict,
+    Kind.LIB: _lib_from_dict,
+    Kind.PLUG: _plug_from_dict,
+}
+
+
 # Create a component from a dictionary.
 def from_dict(
     raw: dict, name: str, base_paths: Paths, lang_config: lang.MultiConfig
@@ -41,31 +90,22 @@ def from_dict(
 
     kind = None
     out_name = None
-    for k in Kind:
-        if k.value in raw:
+    for key, k in KIND_KEYS.items():
+        if key in raw:
             kind = k
-            out_name = raw.pop(k.value)
+            out_name = raw.pop(key)
             break
 
     if kind is None:
-        supported_kinds = ",".join(k.value for k in Kind)
+        supported_kinds = ",".join(KIND_KEYS)
         cli.error(
             f"Could not determine kind of component '{name}'.",
             f"Supported kinds of components: {supported_kinds}",
         )
         return None
 
-    match kind:
-        case Kind.EXE:
-            return ExeOrLibComponent.from_dict(
-                raw, name, out_name, platcond, False, base_paths, lang_config
-            )
-        case Kind.LIB:
-            return ExeOrLibComponent.from_dict(
-                raw, name, out_name, platcond, True, base_paths, lang_config
-            )
-        case Kind.PLUG:
-            return PlugComponent.from_dict(raw, name, out_name, platcond, base_paths)
-
-    cli.error(f"Component kind '{kind.value}' currently unimplemented.")
-    return None
+    factory = FACTORIES.get(kind)
+    if factory is None:
+        cli.error(f"Component kind '{kind.value}' currently unimplemented.")
+        return None
+    return factory(raw, name, out_name, platcond, base_paths, lang_config)
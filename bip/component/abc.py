@@ -2,6 +2,7 @@
 Component abstract base class.
 """
 
+import os
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from enum import IntEnum, auto
@@ -35,10 +36,13 @@ class Contrib:
 @dataclass
 class RunInfo:
     release: bool
+    # Whether parsed recipes and compiled objects may be fetched from and
+    # stored in bip's caches.
+    cache: bool = True
 
 
 # Paths commonly used across different kinds of components.
-@dataclass
+@dataclass(slots=True)
 class Paths:
     src: Path
     obj: Path
@@ -46,36 +50,19 @@ class Paths:
 
     @classmethod
     def from_dict(cls, raw: dict, info: RunInfo) -> "Paths":
-        src: Path
-        if "src" in raw:
-            src = Path(raw["src"])
-        else:
-            src = Path(".")
-
-        out: Path
-        if "out" in raw:
-            out = Path(raw["out"])
-        else:
-            out = Path(".")
-
-        obj: Path
-        if "obj" in raw:
-            obj = Path(raw["obj"])
-        else:
-            obj = Path(".")
-
-        if info.release:
-            obj /= "release"
-            out /= "release"
-        else:
-            obj /= "debug"
-            out /= "debug"
+        # join as strings so that each path is only constructed once
+        mode = "release" if info.release else "debug"
+        src = Path(raw.get("src", "."))
+        obj = Path(os.path.join(raw.get("obj", "."), mode))
+        out = Path(os.path.join(raw.get("out", "."), mode))
 
         return cls(src, obj, out)
 
 
 # A component is the smallest unit of a recipe file.
 class Component(ABC):
+    __slots__ = ("name", "out_name", "platform")
+
     # Unique name of this component.
     name: str
     # Output file basename.
@@ -2,20 +2,31 @@
 ExeOrLibComponent
 """
 
+import json
+import mmap
+import os
 import re
-from copy import deepcopy
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from dataclasses import dataclass
 from enum import StrEnum
+from itertools import chain
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Optional, Union
 
 import bip.cli as cli
 import bip.lang as lang
 import bip.lang.c as C
+import bip.objcache as objcache
 import bip.plat as plat
 
 from .abc import *
 
+if TYPE_CHECKING:
+    import subprocess
+
 
 # Language is used by EXE and LIB components.
 class Language(StrEnum):
@@ -24,12 +35,21 @@ class Language(StrEnum):
     GO = "go"
 
 
-C_EXTS = (".c",)
-CPP_EXTS = (".cpp", ".cxx", ".cc")
-GO_EXTS = (".go",)
+C_EXTS = frozenset({".c"})
+CPP_EXTS = frozenset({".cpp", ".cxx", ".cc"})
+GO_EXTS = frozenset({".go"})
 
+# Language of each source file extension accepted by C/C++ and Go components.
+C_EXT_LANG = {ext: Language.C for ext in C_EXTS} | {
+    ext: Language.CPP for ext in CPP_EXTS
+}
+GO_EXT_LANG = {ext: Language.GO for ext in GO_EXTS}
 
-@dataclass
+# Object file extension for the platform we are running on.
+NATIVE_OBJ_EXT = plat.OBJ_EXT[plat.native()]
+
+
+@dataclass(slots=True)
 class CodeObject:
     # used to discern C and C++ specifically
     lang: Language
@@ -37,11 +57,120 @@ class CodeObject:
     obj: Path
 
 
+# Everything needed to compile a single object file.
+@dataclass(slots=True)
+class CompileJob:
+    obj: CodeObject
+    # compiler executable
+    exe: str
+    info: C.ObjectInfo
+    args: list[str]
+
+
+# Prefix that paths within `directory` start with when joined using pathlib.
+def _dir_prefix(directory: Path) -> str:
+    dir_str = str(directory)
+    if dir_str == ".":
+        return ""
+    return dir_str + os.sep
+
+
+# A source file, either found while listing a directory or given directly.
+SourceFile = Union[os.DirEntry, Path]
+
+
+# Determine the language of a source file from its name using a table such as
+# C_EXT_LANG. Returns None if the file is not a source file.
+def _source_lang(name: str, ext_lang: dict[str, Language]) -> Optional[Language]:
+    dot = name.rfind(".")
+    if dot <= 0:
+        return None
+    return ext_lang.get(name[dot:].lower())
+
+
+# List the source files within `sub`, which may also be a single file, along
+# with their languages. Returns None if it does not exist.
+def _list_sources(
+    sub: Path, recurse: bool, ext_lang: dict[str, Language]
+) -> Optional[list[tuple[SourceFile, Language]]]:
+    try:
+        entries = os.scandir(sub)
+    except NotADirectoryError:
+        src_lang = _source_lang(sub.name, ext_lang)
+        return [] if src_lang is None else [(sub, src_lang)]
+    except FileNotFoundError:
+        return None
+    files: list[tuple[SourceFile, Language]] = []
+    # directory entries already know their type, so this avoids stat-ing every
+    # file again. subdirectories are listed in place, using a stack of open
+    # listings rather than recursion. other files are filtered out by name
+    # before anything else is done with them.
+    stack = [entries]
+    try:
+        while stack:
+            for entry in stack[-1]:
+                if entry.is_dir():
+                    if recurse:
+                        stack.append(os.scandir(entry.path))
+                        break
+                    continue
+                src_lang = _source_lang(entry.name, ext_lang)
+                if src_lang is not None and entry.is_file():
+                    files.append((entry, src_lang))
+            else:
+                stack.pop().close()
+    finally:
+        for entries in stack:
+            entries.close()
+    return files
+
+
+# Matches `#include <file>` and `#include "file"` lines. Only the first group is
+# set for the former, only the second for the latter.
 C_INCLUDE_REGEX = re.compile(
-    r'^(?:\s*/\*.*\*/)?\s*#\s*include\s*(?:(?:<(.*)>)|(?:"(.*)"))\s*$'
+    rb'^[ \t]*#[ \t]*include[ \t]*(?:<([^>\r\n]+)>|"([^"\r\n]+)")', re.MULTILINE
 )
 
 
+# Find the headers included by a C or C++ file that exist in its own directory
+# or one of `include_dirs`. Headers which can not be found there, such as those
+# of the standard library, are left out.
+def _scan_includes(path: str, include_dirs: list[str]) -> list[str]:
+    # the file is mapped rather than read, so the regex runs over the page
+    # cache directly. empty files can not be mapped, but include nothing anyway.
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                matches = [m.group(1, 2) for m in C_INCLUDE_REGEX.finditer(data)]
+    except (OSError, ValueError):
+        return []
+    here = os.path.dirname(path)
+    found = []
+    for angled, quoted in matches:
+        name = os.fsdecode(quoted or angled)
+        search = chain((here,), include_dirs) if quoted else include_dirs
+        for include_dir in search:
+            header = os.path.normpath(os.path.join(include_dir, name))
+            if os.path.isfile(header):
+                found.append(header)
+                break
+    return found
+
+
+# Name of the file, within a component's object directory, remembering the
+# headers included by each source and header file as of the last build, so that
+# unchanged files need not be read again. Its name is prefixed with the
+# component's name since components may share an object directory.
+MANIFEST_SUFFIX = ".bip-manifest.json"
+
+
+# How many compiler processes may run at once while building a component. Each
+# compile is independent, so one per CPU keeps every core busy.
+MAX_PENDING_COMPILES = os.cpu_count() or 1
+
+
 @dataclass
 class Stats:
     total_objects = 0  # total amount of object files used in build
@@ -49,6 +178,7 @@ class Stats:
     compiled_objects = 0  # amount of object files (re)compiled for this build
     compiled_ok = 0  # amount of object files successfully compiled
     compiled_err = 0  # amount of object files that failed to compile
+    cached_objects = 0  # amount of object files restored from the object cache
 
 
 @dataclass
@@ -65,6 +195,33 @@ class ExeLibCfg:
 
 # Component that compiles and links an executable or a shared library.
 class ExeOrLibComponent(Component):
+    __slots__ = (
+        "_is_lib",
+        "_src_dirs",
+        "_paths",
+        "_dyn_libs",
+        "_static_libs",
+        "_lang",
+        "_c_config",
+        "_cpp_config",
+        "_recursive",
+        "_stats",
+        "_old_files",
+        "_seen_src",
+        "_new_files",
+        "_newest_obj_mtime",
+        "_manifest_includes",
+        "_next_includes",
+        "_include_dirs",
+        "_header_stats",
+        "_reuse_obj",
+        "_compile_obj",
+        "_out_file",
+        "_ext_lang",
+        "_log",
+        "_discovered",
+    )
+
     _is_lib: bool
     _src_dirs: list[Path]
     _paths: Paths
@@ -95,15 +252,30 @@ class ExeOrLibComponent(Component):
             self._out_file = self._paths.out / self._exe_name()
         self._src_dirs = cfg.src_dirs
         self._recursive = cfg.recursive
-        self._old_files = []
-        self._new_files = []
+        self._old_files = set()
+        self._new_files = set()
+        self._seen_src = set()
+        self._newest_obj_mtime = 0.0
+        self._manifest_includes = {}
+        self._next_includes = {}
+        self._include_dirs = []
+        self._header_stats = {}
         self._stats = Stats()
+        self._log = []
+        self._discovered = False
 
         # initially assume C even if CPP is specified.
         # this will be changed to CPP later if necessary.
         if lang == Language.CPP:
             self._lang = Language.C
 
+        # the language is only ever changed from C to C++, both of which accept
+        # the same extensions, so we can pick the table up front.
+        if self._lang == Language.GO:
+            self._ext_lang = GO_EXT_LANG
+        else:
+            self._ext_lang = C_EXT_LANG
+
     @classmethod
     def from_dict(
         cls,
@@ -137,13 +309,13 @@ class ExeOrLibComponent(Component):
         if "src" in raw:
             raw_src = raw["src"]
             if isinstance(raw_src, list):
-                src = [base_paths.src / Path(s) for s in raw_src]
+                src = [base_paths.src / s for s in raw_src]
             else:
-                src = [base_paths.src / Path(raw_src)]
+                src = [base_paths.src / raw_src]
         else:
             src = [base_paths.src / name]
 
-        real_lang_config = deepcopy(lang_config)
+        real_lang_config = lang_config.clone()
         if "c" in raw:
             real_lang_config.c.load_overrides(raw.pop("c"))
         if "cpp" in raw:
@@ -178,89 +350,221 @@ class ExeOrLibComponent(Component):
 
         return cls(name, out_name, platform, cfg)
 
-    _old_files: set[Path]
-    _new_files: set[Path]
+    # Sources known to be up to date or out of date, by path. Plain strings are
+    # kept rather than Paths since they are cheaper to hash.
+    _old_files: set[str]
+    _new_files: set[str]
+    # Sources added so far, so that overlapping source directories do not add
+    # the same file twice.
+    _seen_src: set[str]
+    # Modification time of the newest existing object file seen so far.
+    _newest_obj_mtime: float
+    # Lines of verbose output collected while discovering objects.
+    _log: list[str]
+    # Whether the source files have been discovered yet.
+    _discovered: bool
+
+    # Headers included by each source and header file as of the last build,
+    # along with the file's modification time and size at the time.
+    _manifest_includes: dict[str, list]
+    # Same as _manifest_includes, for the files looked at in this build.
+    _next_includes: dict[str, list]
+    # Directories searched for included headers, for both C and C++.
+    _include_dirs: list[str]
+    # Status of each header looked at so far, None if it does not exist.
+    _header_stats: dict[str, Optional[os.stat_result]]
+
+    def _manifest_file(self) -> Path:
+        return self._paths.obj / (self.name + MANIFEST_SUFFIX)
+
+    def _load_manifest(self) -> None:
+        try:
+            with self._manifest_file().open("rb") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        if not isinstance(manifest, dict):
+            manifest = {}
+        self._manifest_includes = manifest.get("includes", {})
+
+    # Write the manifest of this build, once all objects have been compiled.
+    # Failing to do so is not an error, the sources will simply be scanned
+    # again next time.
+    def _save_manifest(self) -> None:
+        for obj in self._compile_obj:
+            if obj.lang == Language.GO:
+                continue
+            src = str(obj.src)
+            try:
+                # scanned now, so the next build need not read the source
+                self._includes(src, os.stat(src))
+            except FileNotFoundError:
+                pass
+        if self._next_includes == self._manifest_includes:
+            return
+        manifest = {"includes": self._next_includes}
+        try:
+            with self._manifest_file().open("w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+        except OSError:
+            pass
+
+    # Headers included by a C or C++ file, reusing the last build's scan if the
+    # file has not changed since.
+    def _includes(self, path: str, st: os.stat_result) -> list[str]:
+        entry = self._next_includes.get(path)
+        if entry is None:
+            entry = self._manifest_includes.get(path)
+            if entry is None or entry[:2] != [st.st_mtime, st.st_size]:
+                includes = _scan_includes(path, self._include_dirs)
+                entry = [st.st_mtime, st.st_size, includes]
+            self._next_includes[path] = entry
+        return entry[2]
+
+    # Check whether any header included by a C or C++ file, directly or through
+    # other headers, was modified after `mtime`. The include graph is walked for
+    # each file, as a header's answer depends on which headers were already
+    # visited when include cycles are involved. Only the stats are reused.
+    def _headers_newer(self, path: str, st: os.stat_result, mtime: float) -> bool:
+        seen = set()
+        stack = list(self._includes(path, st))
+        while stack:
+            header = stack.pop()
+            if header in seen:
+                continue
+            seen.add(header)
+            try:
+                header_st = self._header_stats[header]
+            except KeyError:
+                try:
+                    header_st = os.stat(header)
+                except FileNotFoundError:
+                    header_st = None
+                self._header_stats[header] = header_st
+            if header_st is None or header_st.st_mtime > mtime:
+                # a header that is gone also means the file must be rebuilt
+                return True
+            stack.extend(self._includes(header, header_st))
+        return False
 
-    def _is_old_file(self, file: Path, out: Path) -> bool:
+    # Check whether the object file `out` is up to date with the source `file`.
+    # If `scan` is set, the headers it includes are checked as well.
+    def _is_old_file(
+        self, file: Path, file_st: os.stat_result, out: Path, scan: bool
+    ) -> bool:
         # print("file", file, end="")
-        if not file.exists():
-            # print(" does not exist")
-            return False
-        if not out.exists():
-            # print(" is new (output doesn't exist)")
-            self._new_files.append(file)
-            return False
-        if file in self._old_files:
+        file_str = str(file)
+        if file_str in self._old_files:
             # print(" is old (from cache)")
             return True
-        if file in self._new_files:
+        if file_str in self._new_files:
             # print(" is new (from cache)")
             return False
-        out_mtime = out.stat().st_mtime
-        file_mtime = file.stat().st_mtime
-        if file_mtime > out_mtime:
+        try:
+            out_mtime = os.stat(out).st_mtime
+        except FileNotFoundError:
+            # print(" is new (output doesn't exist)")
+            self._new_files.add(file_str)
+            return False
+        self._newest_obj_mtime = max(self._newest_obj_mtime, out_mtime)
+        if file_st.st_mtime > out_mtime:
             # print(" is new")
-            self._new_files.append(file)
+            self._new_files.add(file_str)
+            return False
+        if scan and self._headers_newer(file_str, file_st, out_mtime):
+            # print(" is new (header changed)")
+            self._new_files.add(file_str)
             return False
         # print(" is old")
-        self._old_files.append(file)
+        self._old_files.add(file_str)
         return True
 
     _reuse_obj: list[CodeObject]
     _compile_obj: list[CodeObject]
     _out_file: Path
-
-    def _add_obj(self, root: Path, src: Path) -> None:
-        obj_ext = plat.OBJ_EXT[plat.native()]
-
-        ext = src.suffix.lower()
-        src_lang = self._lang
-        if self._lang == Language.C:
-            if ext in CPP_EXTS:
-                self._lang = Language.CPP
-                src_lang = Language.CPP
-                # print("(swapping to cpp)")
-            elif ext not in C_EXTS:
-                return
-        elif self._lang == Language.CPP:
-            if ext in C_EXTS:
-                src_lang = Language.C
-            elif ext not in CPP_EXTS:
-                return
-        elif self._lang == Language.GO:
-            if ext not in GO_EXTS:
-                return
-
-        obj = self._paths.obj / src.relative_to(root).with_suffix(obj_ext)
-        # print(src, "(", src_lang, ") ->", obj)
+    # Language of each source file extension this component accepts.
+    _ext_lang: dict[str, Language]
+
+    # Add a source file, given either as a directory entry or a path, as an
+    # object to be reused or compiled.
+    def _add_obj(self, root: Path, src: SourceFile, src_lang: Language) -> None:
+        if src_lang == Language.CPP and self._lang == Language.C:
+            # print("(swapping to cpp)")
+            self._lang = Language.CPP
+
+        # work on plain strings here, only building the Path objects we keep
+        src_str = os.fspath(src)
+        seen = os.path.normpath(src_str)
+        if seen in self._seen_src:
+            return
+        self._seen_src.add(seen)
+        root_prefix = _dir_prefix(root)
+        if src_str.startswith(root_prefix):
+            rel = src_str[len(root_prefix) :]
+        else:
+            rel = os.fspath(Path(src_str).relative_to(root))
+        src_path = Path(src_str)
+        obj = Path(
+            _dir_prefix(self._paths.obj) + os.path.splitext(rel)[0] + NATIVE_OBJ_EXT
+        )
         self._stats.total_objects += 1
-        if self._is_old_file(src, obj):
+        scan = src_lang != Language.GO
+        if self._is_old_file(src_path, src.stat(), obj, scan):
+            if cli.VERBOSE:
+                self._log.append(f"  {src_str} -> {obj} (reuse)")
             self._stats.reused_objects += 1
-            self._reuse_obj.append(CodeObject(src_lang, src, obj))
+            self._reuse_obj.append(CodeObject(src_lang, src_path, obj))
             return
 
-        self._compile_obj.append(CodeObject(src_lang, src, obj))
+        if cli.VERBOSE:
+            self._log.append(f"  {src_str} -> {obj} (compile)")
+        self._compile_obj.append(CodeObject(src_lang, src_path, obj))
         self._stats.compiled_objects += 1
 
-    def _discover_obj(self, root: Path, sub: Path, recurse: bool) -> None:
-        if not sub.exists():
-            cli.warn(f"source {sub} does not exist")
-            return
-        if sub.is_file():
-            self._add_obj(root, sub)
-            return
-        if not sub.is_dir():
+    # Find the source files and decide which of them need to be compiled. This
+    # is only done once, later calls reuse the result.
+    def _discover_obj(self) -> None:
+        if self._discovered:
             return
-        for src in sub.iterdir():
-            if recurse:
-                self._discover_obj(root, src, True)
-            elif src.is_file():
-                self._add_obj(root, src)
+        self._discovered = True
+        self._load_manifest()
+        include = chain(self._c_config.include, self._cpp_config.include)
+        self._include_dirs = list(dict.fromkeys(map(os.fspath, include)))
+        listings: Iterable[Optional[list[tuple[SourceFile, Language]]]]
+        list_sources = partial(
+            _list_sources, recurse=self._recursive, ext_lang=self._ext_lang
+        )
+        if len(self._src_dirs) > 1:
+            # listing the source directories is mostly waiting on the file
+            # system, so list them all at once. files are still added in order.
+            with ThreadPoolExecutor() as pool:
+                listings = list(pool.map(list_sources, self._src_dirs))
+        else:
+            listings = map(list_sources, self._src_dirs)
+
+        for sub, files in zip(self._src_dirs, listings):
+            if files is None:
+                cli.warn(f"source {sub} does not exist")
+                continue
+            for src, src_lang in files:
+                self._add_obj(self._paths.src, src, src_lang)
+
+        # written all at once rather than printing a line per file
+        if self._log:
+            self._log.insert(0, f"{self.name} sources:")
+            sys.stdout.write("\n".join(self._log) + "\n")
+            self._log.clear()
 
     def want_run(self) -> bool:
-        for root in self._src_dirs:
-            self._discover_obj(self._paths.src, root, self._recursive)
-        return len(self._compile_obj) > 0 or not self._out_file.exists()
+        self._discover_obj()
+        if self._compile_obj:
+            return True
+        # nothing needs compiling, so only link if the output is missing or older
+        # than any of the objects
+        try:
+            return os.stat(self._out_file).st_mtime < self._newest_obj_mtime
+        except FileNotFoundError:
+            return True
 
     def _exe_name(self) -> str:
         match plat.native():
@@ -276,12 +580,25 @@ class ExeOrLibComponent(Component):
             case _:
                 return "lib" + self.out_name + ".so"
 
+    # Show the output of an object file's compiler as it is written and wait
+    # for it to finish. If the object has a cache key, store it in the object
+    # cache when it compiles successfully.
+    def _finish_obj(
+        self, obj: CodeObject, proc: "subprocess.Popen", key: Optional[str]
+    ) -> None:
+        cli.progress(f"  {obj.obj.name}")
+        output: list[bytes] = []
+        if not cli.stream(3, proc, output):
+            self._stats.compiled_err += 1
+            return
+        self._stats.compiled_ok += 1
+        if key is not None:
+            objcache.store(key, obj.obj, b"\n".join(output))
+
     def _build_c(self, info: RunInfo) -> bool:
         cli.progress(f"{self.name}")
 
-        parent = self._out_file.parent
-        if not parent.exists():
-            parent.mkdir(parents=True)
+        self._out_file.parent.mkdir(parents=True, exist_ok=True)
 
         cmpnt_cfg = self._c_config
         if self._lang == Language.CPP:
@@ -322,7 +639,10 @@ class ExeOrLibComponent(Component):
             else C.DEFAULT_CPP_STD
         )
 
-        obj_fail = False
+        for obj_dir in {obj.obj.parent for obj in self._compile_obj}:
+            obj_dir.mkdir(parents=True, exist_ok=True)
+
+        jobs: list[CompileJob] = []
         for obj in self._compile_obj:
             cfg = self._c_config
             std = c_std
@@ -332,42 +652,69 @@ class ExeOrLibComponent(Component):
                 std = cpp_std
                 obj_exe = compiler.cpp_compiler
 
-            if not obj.obj.parent.exists():
-                obj.obj.parent.mkdir(parents=True)
-
-            info = C.ObjectInfo(
+            obj_info = C.ObjectInfo(
                 cfg,
                 obj.src,
                 obj.obj,
-                cfg.include,
                 info.release,
-                cfg.define,
                 obj.lang == Language.CPP,
                 std,
                 self._is_lib,
             )
-            cli.progress(f"  {obj.obj.name}")
-            out = cli.cmd_out(obj_exe, C.obj_args(compiler.style, info))
-            if not out.success:
-                self._stats.compiled_err += 1
-                obj_fail = True
+            obj_args = C.obj_args(compiler.style, obj_info)
+            jobs.append(CompileJob(obj, obj_exe, obj_info, obj_args))
+
+        keys: list[Optional[str]] = [None] * len(jobs)
+        # a compiler cache already preprocesses each source to look it up, so
+        # bip's own object cache is only used when there is none
+        if info.cache and compiler.cache_wrapper is None and jobs:
+            # computing a key means running the preprocessor, which is
+            # independent for each object, so do them all at once
+            def job_key(job: CompileJob) -> Optional[str]:
+                pp_args = C.pp_args(compiler.style, job.info)
+                return objcache.key(job.exe, pp_args, job.args)
+
+            with ThreadPoolExecutor() as pool:
+                keys = list(pool.map(job_key, jobs))
+
+        # keep up to MAX_PENDING_COMPILES compilers running at once. they are
+        # finished in the order they were started, so output stays in order
+        pending: deque[tuple[CodeObject, subprocess.Popen, Optional[str]]] = deque()
+        for job, key in zip(jobs, keys):
+            cached = None if key is None else objcache.fetch(key, job.obj.obj)
+            if cached is not None:
+                cli.progress(f"  {job.obj.obj.name} (cached)")
+                # show the warnings it was compiled with again
+                for line in cached.splitlines():
+                    cli.wrapped(3, line.decode("utf-8", "replace"))
+                self._stats.cached_objects += 1
+                continue
+
+            if len(pending) >= MAX_PENDING_COMPILES:
+                self._finish_obj(*pending.popleft())
+            if info.cache:
+                proc = cli.spawn_merged(*compiler.wrap(job.exe, job.args))
             else:
-                self._stats.compiled_ok += 1
-
-            if len(out.stdout) > 0:
-                cli.wrapped(3, out.stdout.decode("utf-8").strip())
-            if len(out.stderr) > 0:
-                cli.wrapped(3, out.stderr.decode("utf-8").strip())
+                proc = cli.spawn_merged(job.exe, job.args)
+            if proc is None:
+                self._stats.compiled_err += 1
+                continue
+            pending.append((job.obj, proc, key))
+        while pending:
+            self._finish_obj(*pending.popleft())
 
+        obj_fail = self._stats.compiled_err > 0
         if obj_fail:
+            done = self._stats.compiled_ok + self._stats.cached_objects
             cli.failure(
-                f" Fail. {self._stats.compiled_ok}/{self._stats.compiled_objects} objects compiled"
+                f" Fail. {done}/{self._stats.compiled_objects} objects compiled"
             )
             return False
+        self._save_manifest()
 
         info = C.LinkInfo(
             cmpnt_cfg,
-            [obj.obj for obj in self._compile_obj + self._reuse_obj],
+            [obj.obj for obj in chain(self._compile_obj, self._reuse_obj)],
             self._out_file,
             [self._paths.out],
             self._dyn_libs,
@@ -378,14 +725,17 @@ class ExeOrLibComponent(Component):
         )
         cli.progress(f"  {self._out_file.name}")
         if self._is_lib:
-            success = cli.cmd(link_exe, C.lib_args(compiler.style, info))
+            link_args = C.lib_args(compiler.style, info)
         else:
-            success = cli.cmd(link_exe, C.exe_args(compiler.style, info))
+            link_args = C.exe_args(compiler.style, info)
+        rsp = self._paths.obj / (self.name + ".rsp")
+        success = cli.cmd(link_exe, C.response_args(compiler.style, link_args, rsp))
 
         if success:
-            cli.success(
-                f" OK. {self._stats.compiled_ok} objects compiled, {self._stats.reused_objects} objects reused"
-            )
+            summary = f" OK. {self._stats.compiled_ok} objects compiled, {self._stats.reused_objects} objects reused"
+            if self._stats.cached_objects > 0:
+                summary += f", {self._stats.cached_objects} from cache"
+            cli.success(summary)
         else:
             cli.failure(f" Fail. Could not link.")
         return success
@@ -398,11 +748,11 @@ class ExeOrLibComponent(Component):
         return False
 
     def clean(self) -> bool:
-        for root in self._src_dirs:
-            self._discover_obj(self._paths.src, root, self._recursive)
-        for obj in self._compile_obj + self._reuse_obj:
-            if obj.obj.exists():
-                obj.obj.unlink()
+        self._discover_obj()
+        for obj in chain(self._compile_obj, self._reuse_obj):
+            obj.obj.unlink(missing_ok=True)
+        self._manifest_file().unlink(missing_ok=True)
+        (self._paths.obj / (self.name + ".rsp")).unlink(missing_ok=True)
         return False
 
     def contrib(self) -> list[Contrib]:
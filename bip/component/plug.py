@@ -2,7 +2,6 @@
 PlugComponent
 """
 
-import importlib
 from types import ModuleType
 from typing import Callable, Optional
 
@@ -10,6 +9,16 @@ from .abc import *
 
 
 class PlugComponent(Component):
+    __slots__ = (
+        "_module",
+        "_settings",
+        "_base_paths",
+        "_configure",
+        "_run",
+        "_want_run",
+        "_clean",
+    )
+
     _module: Optional[ModuleType]
     _settings: dict
     _base_paths: Paths
@@ -57,6 +66,8 @@ class PlugComponent(Component):
         if self._module is not None:
             return True
 
+        import importlib.util
+
         mod_path = self._base_paths.src.joinpath(self.out_name, "plug.py")
         mod_spec = importlib.util.spec_from_file_location("plug", mod_path)
         if mod_spec is None:
@@ -11,3 +11,7 @@ import bip.lang.c as C
 class MultiConfig:
     c: C.Config = field(default_factory=C.Config)
     cpp: C.Config = field(default_factory=C.Config)
+
+    # Copy the configuration of every language, see C.Config.clone.
+    def clone(self) -> "MultiConfig":
+        return MultiConfig(self.c.clone(), self.cpp.clone())
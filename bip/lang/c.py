@@ -3,8 +3,9 @@ C and C++ language support.
 """
 
 import struct
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from enum import IntEnum, auto
+from functools import cache
 from pathlib import Path
 from shutil import which
 from typing import Any, Optional
@@ -51,39 +52,45 @@ class Config:
     # Should symbols default to hidden visibility (for GNU-like compilers on
     # non-Windows platforms)
     hide_symbols: bool = False
+    # Formatted include and define flags for each FlagStyle. These are the same
+    # for every object file using this config, so they are only formatted once.
+    _pp_flags: dict[FlagStyle, tuple[list[str], list[str]]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    # Copy this config, such that overrides loaded into the copy do not affect
+    # the original. The formatted flags are shared until then.
+    def clone(self) -> "Config":
+        copy = replace(self, include=self.include.copy(), define=self.define.copy())
+        copy._pp_flags = self._pp_flags
+        return copy
 
     # Load overrides from a dictionary
     def load_overrides(self, raw: dict[str, Any]):
-        if "compiler" in raw:
-            self.compiler = raw.pop("compiler")
-        if "std" in raw:
-            self.std = raw.pop("std")
-        if "define" in raw:
-            self.define.update(raw.pop("define"))
-        if "include" in raw:
-            self.include.extend(raw.pop("include"))
-        if "noexcept" in raw:
-            self.noexcept = raw.pop("noexcept")
-        if "hide_symbols" in raw:
-            self.hide_symbols = raw.pop("hide_symbols")
-        if "hide-symbols" in raw:
-            self.hide_symbols = raw.pop("hide-symbols")
+        # replaced rather than cleared, as it may be shared with a clone
+        self._pp_flags = {}
+        # pop with a default looks every key up only once
+        pop = raw.pop
+        self.compiler = pop("compiler", self.compiler)
+        self.std = pop("std", self.std)
+        self.define.update(pop("define", ()))
+        self.include.extend(pop("include", ()))
+        self.noexcept = pop("noexcept", self.noexcept)
+        self.hide_symbols = pop("hide_symbols", self.hide_symbols)
+        self.hide_symbols = pop("hide-symbols", self.hide_symbols)
 
 
 # Information to compile an object file.
-@dataclass
+@dataclass(slots=True)
 class ObjectInfo:
+    # Language config, which also provides the include directories and defines.
     cfg: Config
     # Source file.
     src: Path
     # Output object file.
     out: Path
-    # Include directories.
-    include: list[Path]
     # Build with optimizations?
     release: bool
-    # Extra preprocessor defines.
-    defines: dict[str, Optional[str]]
     # Is this a C++ file?
     is_cpp: bool
     # Which C/C++ standard to use.
@@ -91,19 +98,56 @@ class ObjectInfo:
     pic: bool
 
 
+# Enum members used by the flag builders for every object file. Reading a member
+# through its enum class is several times slower than reading a module global,
+# so they are bound here once.
+_GNU = FlagStyle.GNU
+_MSC = FlagStyle.MSC
+# Whether we are running on Windows.
+_ON_WINDOWS = plat.native() == plat.ID.WINDOWS
+
 MSC_VERSION_DEF = f"/D_BIP={VERSION_NUM}"
 GNU_VERSION_DEF = f"-D_BIP={VERSION_NUM}"
 
+# Constant flag groups, shared between invocations instead of being rebuilt for
+# every object file.
+GNU_OBJ_RELEASE = ("-O3", "-flto", "-ffast-math", "-msse4.2", "-DNDEBUG")
+GNU_OBJ_DEBUG = ("-O0", "-g", "-Wall", "-Wpedantic", "-Wextra", "-DDEBUG")
+MSC_OBJ_RELEASE = ("/O2", "/fp:fast", "/GL", "/DNDEBUG")
+MSC_OBJ_DEBUG = ("/Od", "/DEBUG", "/W3", "/DDEBUG")
+# some additional flags to bring msvc to the modern day
+MSC_OBJ_MODERN = ("/nologo", "/diagnostics:caret", "/utf-8")
+MSC_LIB_RELEASE = ("/MD", "/LD", "/GL")
+MSC_LIB_DEBUG = ("/MDd", "/LDd")
+MSC_EXE_RELEASE = ("/MD", "/GL")
+MSC_EXE_DEBUG = ("/MDd",)
+
+
+# Get the include and define flags for an object file, formatting them only on
+# first use for the object's config.
+def _pp_flags(style: FlagStyle, info: ObjectInfo) -> tuple[list[str], list[str]]:
+    cached = info.cfg._pp_flags.get(style)
+    if cached is not None:
+        return cached
+
+    prefix = "-" if style == _GNU else "/"
+    include_flags = [f"{prefix}I{i}" for i in info.cfg.include]
+    define_flags = [
+        f"{prefix}D{name}={val}" if val is not None else f"{prefix}D{name}"
+        for name, val in info.cfg.define.items()
+    ]
+    cached = (include_flags, define_flags)
+    info.cfg._pp_flags[style] = cached
+    return cached
 
-def _gnu_obj_args(info: ObjectInfo) -> list[str]:
-    flags = []
 
-    flags.extend(["-c", str(info.src), "-o", str(info.out)])
+def _gnu_obj_args(info: ObjectInfo) -> list[str]:
+    flags = ["-c", str(info.src), "-o", str(info.out)]
 
-    for i in info.include:
-        flags.append(f"-I{i}")
+    include_flags, define_flags = _pp_flags(_GNU, info)
+    flags.extend(include_flags)
 
-    if plat.native() != plat.ID.WINDOWS:
+    if not _ON_WINDOWS:
         if info.pic:
             flags.append("-fPIC")
         if info.cfg.hide_symbols:
@@ -111,17 +155,10 @@ def _gnu_obj_args(info: ObjectInfo) -> list[str]:
 
     flags.append("-m64")
 
-    if info.release:
-        flags.extend(["-O3", "-flto", "-ffast-math", "-msse4.2", "-DNDEBUG"])
-    else:
-        flags.extend(["-O0", "-g", "-Wall", "-Wpedantic", "-Wextra", "-DDEBUG"])
+    flags.extend(GNU_OBJ_RELEASE if info.release else GNU_OBJ_DEBUG)
 
-    for [name, val] in info.defines.items():
-        if val is not None:
-            flags.append(f"-D{name}={val}")
-        else:
-            flags.append(f"-D{name}")
-    flags.append(f"-D_BIP={VERSION_NUM}")
+    flags.extend(define_flags)
+    flags.append(GNU_VERSION_DEF)
 
     flags.append(f"--std={info.std}")
 
@@ -134,51 +171,58 @@ def _gnu_obj_args(info: ObjectInfo) -> list[str]:
 def _msc_obj_args(info: ObjectInfo) -> list[str]:
     flags = ["/c", str(info.src), f"/Fo{info.out}"]
 
-    for i in info.include:
-        flags.append(f"/I{i}")
+    include_flags, define_flags = _pp_flags(_MSC, info)
+    flags.extend(include_flags)
 
-    if info.release:
-        flags.extend(["/O2", "/fp:fast", "/GL", "/DNDEBUG"])
-    else:
-        flags.extend(["/Od", "/DEBUG", "/W3", "/DDEBUG"])
+    flags.extend(MSC_OBJ_RELEASE if info.release else MSC_OBJ_DEBUG)
 
-    for [name, val] in info.defines.items():
-        if val is not None:
-            flags.append(f"/D{name}={val}")
-        else:
-            flags.append(f"/D{name}")
-    flags.append(f"/D_BIP={VERSION_NUM}")
+    flags.extend(define_flags)
+    flags.append(MSC_VERSION_DEF)
 
-    if info.is_cpp:
-        flags.append("/TP")
-    else:
-        flags.append("/TC")
+    flags.append("/TP" if info.is_cpp else "/TC")
 
-    flags.extend([f"/std:{info.std}", "/permissive-"])
+    flags.extend((f"/std:{info.std}", "/permissive-"))
 
     if not info.cfg.noexcept:
         flags.append("/EHsc")
 
-    # some additional flags to bring msvc to the modern day
-    flags.extend(["/nologo", "/diagnostics:caret", "/utf-8"])
+    flags.extend(MSC_OBJ_MODERN)
 
     if info.release:
-        flags.extend(["/link", "/LTCG"])
+        flags.extend(("/link", "/LTCG"))
 
     return flags
 
 
+# Functions determining the flags for compiling an object file for each
+# FlagStyle.
+OBJ_ARGS = {FlagStyle.GNU: _gnu_obj_args, FlagStyle.MSC: _msc_obj_args}
+
+
 # Determine the flags for compiling an object file given the FlagStyle.
 def obj_args(style: FlagStyle, info: ObjectInfo) -> list[str]:
-    match style:
-        case FlagStyle.GNU:
-            return _gnu_obj_args(info)
-        case FlagStyle.MSC:
-            return _msc_obj_args(info)
+    return OBJ_ARGS[style](info)
+
+
+# Determine the flags for preprocessing a source file to stdout given the
+# FlagStyle. The same flags as for compiling are used, so the output reflects
+# everything the compiler would see.
+def pp_args(style: FlagStyle, info: ObjectInfo) -> list[str]:
+    if style == _GNU:
+        flags = _gnu_obj_args(info)
+        # ["-c", src, "-o", out, ...]
+        flags[0] = "-E"
+        del flags[2:4]
+        return flags
+    flags = _msc_obj_args(info)
+    # ["/c", src, "/Fo<out>", ...]
+    flags[0] = "/E"
+    del flags[2]
+    return flags
 
 
 # Information to link a shared library or an executable.
-@dataclass
+@dataclass(slots=True)
 class LinkInfo:
     cfg: Config
     # Object files.
@@ -202,34 +246,27 @@ class LinkInfo:
 def _gnu_lib_args(info: LinkInfo) -> list[str]:
     flags = ["-shared", "-o", str(info.out)]
 
-    for f in info.obj:
-        flags.append(str(f))
+    flags.extend(map(str, info.obj))
 
-    for d in info.lib_dirs:
-        flags.append(f"-L{d}")
+    flags += [f"-L{d}" for d in info.lib_dirs]
 
-    if plat.native() != plat.ID.WINDOWS:
-        flags.append("-Wl,-rpath,\\$ORIGIN")
+    if not _ON_WINDOWS:
+        flags.append("-Wl,-rpath,$ORIGIN")
         if info.cfg.hide_symbols:
             flags.append("-fvisibility=hidden")
 
-    if info.release:
-        flags.append("-flto")
-    else:
-        flags.append("-g")
+    flags.append("-flto" if info.release else "-g")
 
     if info.linker is not None:
         flags.append(f"-fuse-ld={info.linker}")
-    elif plat.native() == plat.ID.WINDOWS:
+    elif _ON_WINDOWS:
         flags.append("-fuse-ld=lld-link")
 
     if info.cfg.noexcept:
         flags.append("-fno-exceptions")
 
-    for l in info.dyn_libs:
-        flags.append(f"-l{l}")
-    for l in info.static_libs:
-        flags.append(f"-l:lib{l}.a")
+    flags += [f"-l{l}" for l in info.dyn_libs]
+    flags += [f"-l:lib{l}.a" for l in info.static_libs]
 
     return flags
 
@@ -237,28 +274,21 @@ def _gnu_lib_args(info: LinkInfo) -> list[str]:
 def _msc_lib_args(info: LinkInfo) -> list[str]:
     flags = [f"-Fe{info.out}"]
 
-    for f in info.obj:
-        flags.append(str(f))
+    flags.extend(map(str, info.obj))
 
-    if info.release:
-        flags.extend(["/MD", "/LD", "/GL"])
-    else:
-        flags.extend(["/MDd", "/LDd"])
+    flags.extend(MSC_LIB_RELEASE if info.release else MSC_LIB_DEBUG)
 
     flags.append("/nologo")
 
-    for l in info.dyn_libs:
-        flags.append(f"{l}.lib")
-    for l in info.static_libs:
-        flags.append(f"{l}.lib")
+    flags += [f"{l}.lib" for l in info.dyn_libs]
+    flags += [f"{l}.lib" for l in info.static_libs]
 
     flags.append("/link")
 
     if info.release:
         flags.append("/LTCG")
 
-    for d in info.lib_dirs:
-        flags.append(f"/LIBPATH:{d}")
+    flags += [f"/LIBPATH:{d}" for d in info.lib_dirs]
 
     return flags
 
@@ -266,32 +296,25 @@ def _msc_lib_args(info: LinkInfo) -> list[str]:
 def _gnu_exe_args(info: LinkInfo) -> list[str]:
     flags = ["-o", str(info.out)]
 
-    for f in info.obj:
-        flags.append(str(f))
+    flags.extend(map(str, info.obj))
 
-    for d in info.lib_dirs:
-        flags.append(f"-L{d}")
+    flags += [f"-L{d}" for d in info.lib_dirs]
 
-    if plat.native() != plat.ID.WINDOWS:
-        flags.append("-Wl,-rpath,\\$ORIGIN")
+    if not _ON_WINDOWS:
+        flags.append("-Wl,-rpath,$ORIGIN")
 
-    if info.release:
-        flags.extend(["-flto"])
-    else:
-        flags.extend(["-g"])
+    flags.append("-flto" if info.release else "-g")
 
     if info.linker is not None:
         flags.append(f"-fuse-ld={info.linker}")
-    elif plat.native() == plat.ID.WINDOWS:
+    elif _ON_WINDOWS:
         flags.append("-fuse-ld=lld-link")
 
     if info.cfg.noexcept:
         flags.append("-fno-exceptions")
 
-    for l in info.dyn_libs:
-        flags.append(f"-l{l}")
-    for l in info.static_libs:
-        flags.append(f"-l:lib{l}.a")
+    flags += [f"-l{l}" for l in info.dyn_libs]
+    flags += [f"-l:lib{l}.a" for l in info.static_libs]
 
     return flags
 
@@ -299,51 +322,70 @@ def _gnu_exe_args(info: LinkInfo) -> list[str]:
 def _msc_exe_args(info: LinkInfo) -> list[str]:
     flags = [f"-Fe{info.out}"]
 
-    for f in info.obj:
-        flags.append(str(f))
+    flags.extend(map(str, info.obj))
 
-    if info.release:
-        flags.extend(["/MD", "/GL"])
-    else:
-        flags.append("/MDd")
+    flags.extend(MSC_EXE_RELEASE if info.release else MSC_EXE_DEBUG)
 
     flags.append("/nologo")
 
-    for l in info.dyn_libs:
-        flags.append(f"{l}.lib")
-    for l in info.static_libs:
-        flags.append(f"{l}.lib")
+    flags += [f"{l}.lib" for l in info.dyn_libs]
+    flags += [f"{l}.lib" for l in info.static_libs]
 
     flags.append("/link")
 
     if info.release:
         flags.append("/LTCG")
 
-    for d in info.lib_dirs:
-        flags.append(f"/LIBPATH:{d}")
+    flags += [f"/LIBPATH:{d}" for d in info.lib_dirs]
 
     return flags
 
 
+# Functions determining the flags for linking a shared library or an
+# executable for each FlagStyle.
+LIB_ARGS = {FlagStyle.GNU: _gnu_lib_args, FlagStyle.MSC: _msc_lib_args}
+EXE_ARGS = {FlagStyle.GNU: _gnu_exe_args, FlagStyle.MSC: _msc_exe_args}
+
+
 # Determine the flags for linking a shared library given the FlagStyle.
 def lib_args(style: FlagStyle, info: LinkInfo) -> list[str]:
-    match style:
-        case FlagStyle.GNU:
-            return _gnu_lib_args(info)
-        case FlagStyle.MSC:
-            return _msc_lib_args(info)
+    return LIB_ARGS[style](info)
 
 
 def exe_args(style: FlagStyle, info: LinkInfo) -> list[str]:
-    match style:
-        case FlagStyle.GNU:
-            return _gnu_exe_args(info)
-        case FlagStyle.MSC:
-            return _msc_exe_args(info)
+    return EXE_ARGS[style](info)
+
+
+# Longest command line passed to a compiler as-is. Windows limits command lines
+# to 32767 characters, so longer ones are passed through a response file.
+MAX_CMDLINE_LEN = 30000
+
+
+# Quote an argument for a response file.
+def _rsp_quote(style: FlagStyle, arg: str) -> str:
+    if style == _GNU:
+        # GCC reads backslashes in response files as escapes
+        arg = arg.replace("\\", "\\\\")
+    return '"' + arg.replace('"', '\\"') + '"'
+
+
+# If `args` are too long for a command line, write them to the response file
+# `rsp` and return the arguments to use instead. Both GCC-like and MSVC-like
+# compilers read arguments from `@file`.
+def response_args(style: FlagStyle, args: list[str], rsp: Path) -> list[str]:
+    if sum(len(a) + 1 for a in args) <= MAX_CMDLINE_LEN:
+        return args
+    try:
+        rsp.write_text(
+            "\n".join(_rsp_quote(style, a) for a in args), encoding="utf-8"
+        )
+    except OSError:
+        return args
+    return [f"@{rsp}"]
 
 
 # Generic information about a C or C++ compiler.
-@dataclass
+@dataclass(slots=True)
 class Compiler:
     # Name of compiler displayed to user.
     name: str
@@ -354,13 +396,24 @@ class Compiler:
     cpp_compiler: Optional[str]
     # See FlagStyle.
     style: FlagStyle
+    # Compiler cache (such as ccache) to run object compilations through, if
+    # one is available.
+    cache_wrapper: Optional[str] = None
+
+    # Get the executable and arguments to compile an object file with `exe`,
+    # going through the cache wrapper if there is one.
+    def wrap(self, exe: str, args: list[str]) -> tuple[str, list[str]]:
+        if self.cache_wrapper is None:
+            return exe, args
+        return self.cache_wrapper, [exe, *args]
 
     def check_version(self) -> Optional[str]:
         if self.style == FlagStyle.GNU:
             out = cli.cmd_out(self.c_compiler, ["--version"])
-            if out is None:
+            if not out.success:
                 return None
-            return out.stdout.decode("utf-8").splitlines()[0]
+            # only the first line is shown, so only it is decoded
+            return out.stdout.split(b"\n", 1)[0].rstrip().decode("utf-8", "replace")
         return None
 
 
@@ -372,21 +425,32 @@ KNOWN_COMPILERS = {
     "msc": Compiler("MSC", "cl", "cl", FlagStyle.MSC),
 }
 
+# Compiler caches that can wrap compiler invocations, in order of preference,
+# along with the flag styles they support.
+CACHE_WRAPPERS = (
+    ("sccache", (FlagStyle.GNU, FlagStyle.MSC)),
+    ("ccache", (FlagStyle.GNU,)),
+)
+
 # Alternate names for compilers.
 COMPILER_ALIASES = {"gcc": "gnu", "msvc": "msc"}
 
 
+# Look up an executable on PATH. Many compilers use the same executable for C
+# and C++, so each one is only looked up once.
+_which = cache(which)
+
+
 # Try to determine which compiler to use based on its name.
 def find_compiler(name: str) -> Optional[Compiler]:
     name = name.lower()
-    if name in KNOWN_COMPILERS:
-        return KNOWN_COMPILERS[name]
-    if name in COMPILER_ALIASES:
-        return KNOWN_COMPILERS[COMPILER_ALIASES[name]]
-    return None
+    return KNOWN_COMPILERS.get(COMPILER_ALIASES.get(name, name))
 
 
-# Check if the given compiler is available in our current environment.
+# Check if the given compiler is available in our current environment. The
+# environment does not change during a run, so each compiler is only looked up
+# once.
+@cache
 def has_compiler(name: str) -> Optional[Compiler]:
     # print("compiler", name)
     compiler = find_compiler(name)
@@ -395,34 +459,42 @@ def has_compiler(name: str) -> Optional[Compiler]:
         return None
 
     if compiler.c_compiler is not None:
-        if which(compiler.c_compiler) is None:
+        if _which(compiler.c_compiler) is None:
             # print("  C frontend not present")
             return None
 
     if compiler.cpp_compiler is not None:
-        if which(compiler.cpp_compiler) is None:
+        if _which(compiler.cpp_compiler) is None:
             # print("  C++ frontend not present")
             return None
 
     # print("  is OK")
+    for wrapper, styles in CACHE_WRAPPERS:
+        if compiler.style in styles and _which(wrapper) is not None:
+            # the known compilers are shared, so they are not modified
+            return replace(compiler, cache_wrapper=wrapper)
     return compiler
 
 
+# Compiler used on each platform when Clang is not available.
+PLATFORM_COMPILERS = {
+    plat.ID.LINUX: "gnu",
+    plat.ID.WINDOWS: "msc",
+    plat.ID.DARWIN: "gnu",
+}
+
+
 # Determine which compiler to use by default.
+@cache
 def default_compiler() -> Optional[Compiler]:
     option1 = has_compiler("clang")
     if option1 is not None:
         return option1
 
-    match plat.native():
-        case plat.ID.LINUX:
-            return has_compiler("gnu")
-        case plat.ID.WINDOWS:
-            return has_compiler("msc")
-        case plat.ID.DARWIN:
-            return has_compiler("gnu")
-
-    return None
+    fallback = PLATFORM_COMPILERS.get(plat.native())
+    if fallback is None:
+        return None
+    return has_compiler(fallback)
 
 def _show_compiler(compiler: Compiler, text = "") -> None:
     print(f"{text}{compiler.name}:")
@@ -436,6 +508,8 @@ def _show_compiler(compiler: Compiler, text = "") -> None:
     else:
         print(f"  C++ frontend executable: {compiler.cpp_compiler}")
     print(f"  Flags style: {FLAG_STYLE_NAMES[compiler.style]}")
+    if compiler.cache_wrapper is not None:
+        print(f"  Cache wrapper: {compiler.cache_wrapper}")
 
 def show_compiler_info() -> bool:
     compiler = default_compiler()
@@ -0,0 +1,153 @@
+"""
+Content-addressed object file cache.
+"""
+
+import hashlib
+import os
+import shutil
+from functools import cache
+from pathlib import Path
+from typing import Optional
+
+import bip.cli as cli
+
+
+# Root directory of all of bip's caches. It can be changed using the BIP_CACHE
+# environment variable.
+def cache_root() -> Path:
+    root = os.environ.get("BIP_CACHE")
+    if root is None:
+        return Path.home() / ".cache" / "bip"
+    return Path(root)
+
+
+# Directory holding cached object files.
+def cache_dir() -> Path:
+    return cache_root() / "objcache"
+
+
+# Identity of a compiler: its resolved path along with the modification time and
+# size of the executable, so that upgrading the compiler invalidates the objects
+# it built. Falls back to the name if the compiler is not found on PATH.
+@cache
+def _compiler_id(exe: str) -> str:
+    path = shutil.which(exe)
+    if path is None:
+        return exe
+    path = os.path.realpath(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path
+    return f"{path}|{st.st_mtime_ns}|{st.st_size}"
+
+
+# Compute the cache key of an object file from the compiler, the flags used to
+# compile it and its preprocessed source. Returns None if the source could not
+# be preprocessed.
+def key(exe: str, pp_args: list[str], obj_args: list[str]) -> Optional[str]:
+    pp = cli.cmd_out(exe, pp_args)
+    if not pp.success:
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(_compiler_id(exe).encode("utf-8"))
+    digest.update(repr(obj_args).encode("utf-8"))
+    digest.update(pp.stdout)
+    return digest.hexdigest()
+
+
+# Copy a cached object file to `dest`. Returns the output the compiler printed
+# when it was compiled, so that its warnings are shown again, or None if it
+# isn't cached.
+def fetch(key: str, dest: Path) -> Optional[bytes]:
+    cached = cache_dir() / (key + dest.suffix)
+    try:
+        shutil.copyfile(cached, dest)
+    except OSError:
+        return None
+    try:
+        # mark it as recently used, so that trim() keeps it
+        os.utime(cached)
+    except OSError:
+        pass
+    try:
+        return (cached.parent / (key + LOG_SUFFIX)).read_bytes()
+    except FileNotFoundError:
+        return b""
+    except OSError:
+        return None
+
+
+# Maximum total size of the cached object files, in bytes. Once it is exceeded
+# the least recently used objects are removed. The whole cache can be cleared by
+# removing its directory.
+MAX_CACHE_SIZE = 1 << 30
+
+# Suffix of the files holding the compiler output for a cached object.
+LOG_SUFFIX = ".log"
+
+# Whether anything was stored in the cache during this run.
+_stored = False
+
+
+# Store a freshly compiled object file in the cache, along with the output of
+# the compiler. Failing to do so is not an error, the object will simply be
+# compiled again next time.
+def store(key: str, obj: Path, output: bytes) -> None:
+    global _stored
+    cached = cache_dir() / (key + obj.suffix)
+    log = cached.parent / (key + LOG_SUFFIX)
+    tmp = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+    try:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        # the output is written first, so a cached object always has it
+        if output:
+            tmp.write_bytes(output)
+            os.replace(tmp, log)
+        else:
+            log.unlink(missing_ok=True)
+        shutil.copyfile(obj, tmp)
+        os.replace(tmp, cached)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        return
+    _stored = True
+
+
+# Remove the least recently used objects until the cache fits in
+# MAX_CACHE_SIZE. Only does anything if objects were stored during this run.
+def trim() -> None:
+    if not _stored:
+        return
+    objects = []
+    total = 0
+    try:
+        with os.scandir(cache_dir()) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                total += st.st_size
+                # compiler output is removed along with its object
+                if not entry.name.endswith(LOG_SUFFIX):
+                    objects.append((st.st_mtime, st.st_size, entry.path))
+    except OSError:
+        return
+    if total <= MAX_CACHE_SIZE:
+        return
+    objects.sort()
+    for _, size, path in objects:
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        log = os.path.splitext(path)[0] + LOG_SUFFIX
+        try:
+            total -= os.stat(log).st_size
+            os.unlink(log)
+        except OSError:
+            pass
+        if total <= MAX_CACHE_SIZE:
+            break
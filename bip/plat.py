@@ -3,6 +3,7 @@ Platform detection.
 """
 
 from enum import IntEnum, auto
+from functools import cache
 from platform import system
 from typing import Optional
 
@@ -40,20 +41,20 @@ OBJ_EXT = {
 
 # Try to find a platform ID given its name, return None otherwise.
 def find(name: str) -> Optional[ID]:
-    if name.lower() in NAMES:
-        return NAMES[name.lower()]
-    return None
+    return NAMES.get(name.lower())
+
+
+# Platform for each name returned by platform.system().
+SYSTEMS = {
+    "Linux": ID.LINUX,
+    "Windows": ID.WINDOWS,
+    "Darwin": ID.DARWIN,
+}
 
 
 # Determine what platform we are running on. If we cannot reliably determine, we
-# just assume LINUX is close enough.
+# just assume LINUX is close enough. The answer never changes while we are
+# running, so it is only determined once.
+@cache
 def native() -> ID:
-    match system():
-        case "Linux":
-            return ID.LINUX
-        case "Windows":
-            return ID.WINDOWS
-        case "Darwin":
-            return ID.DARWIN
-        case _:
-            return ID.LINUX
+    return SYSTEMS.get(system(), ID.LINUX)
@@ -1,7 +1,9 @@
-import tomllib
+import os
+import pickle
 from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 import bip.cli as cli
 import bip.component as component
@@ -10,37 +12,113 @@ import bip.lang.c as C
 import bip.plat as plat
 import bip.version as version
 
+# Parse a TOML file into a dictionary. Returns None and reports an error if the
+# file is not valid TOML. The parser is only imported here, since a recipe
+# loaded from the cache does not need one.
+#
+# rtoml is a faster, Rust-based TOML parser. It is used instead of tomllib when it
+# is installed (`pip install bip[fast]`).
+def _parse_toml(path: Path) -> Optional[dict[str, Any]]:
+    try:
+        import rtoml
+    except ImportError:
+        import tomllib
 
-@dataclass
+        try:
+            with path.open("rb") as f:
+                return tomllib.load(f)
+        except tomllib.TOMLDecodeError as e:
+            cli.error(f"Invalid recipe file: {e}")
+            return None
+
+    try:
+        return rtoml.loads(path.read_text(encoding="utf-8"))
+    except rtoml.TomlParsingError as e:
+        cli.error(f"Invalid recipe file: {e}")
+        return None
+
+
+# Fingerprint of bip's own code. A recipe cached by a different version of bip
+# may not be loadable, or may be missing state this version expects.
+@cache
+def _code_fingerprint() -> tuple:
+    files = []
+    for file in sorted(Path(__file__).parent.rglob("*.py")):
+        st = file.stat()
+        files.append((str(file), st.st_mtime_ns, st.st_size))
+    return (version.VERSION_STR, tuple(files))
+
+
+# Where a parsed recipe is cached: a `.bip` directory next to the recipe file,
+# with one file per recipe file and build mode. Cached recipes are unpickled, so
+# they are kept with the project rather than in a cache directory that may be
+# shared with other users.
+def _recipe_cache_file(path: Path, info: component.abc.RunInfo) -> Path:
+    mode = "release" if info.release else "debug"
+    return path.parent / ".bip" / f"{path.name}.{mode}.cache"
+
+
+@dataclass(slots=True)
 class Recipe:
     path: Path
     components: list[component.Component]
     lang_config: lang.MultiConfig
 
+    # Load a recipe, reusing the previously parsed one if the file has not
+    # changed since.
     @classmethod
     def load(cls, path: Path, info: component.abc.RunInfo) -> Optional["Recipe"]:
-        raw: dict[str, Any]
+        if not info.cache:
+            return cls.parse(path, info)
+
+        st = path.stat()
+        state = (_code_fingerprint(), plat.native(), st.st_mtime_ns, st.st_size)
+        cache_file = _recipe_cache_file(path, info)
         try:
-            with path.open("rb") as f:
-                raw = tomllib.load(f)
-        except tomllib.TOMLDecodeError as e:
-            cli.error(f"Invalid recipe file: {e}")
+            with cache_file.open("rb") as f:
+                cached_state, warnings, recipe = pickle.load(f)
+            if cached_state == state:
+                for text, tip in warnings:
+                    cli.warn(text, tip)
+                return recipe
+        except Exception:
+            # anything wrong with the cache file is just a cache miss
+            pass
+
+        cli.RECORDED_WARNINGS = warnings = []
+        try:
+            recipe = cls.parse(path, info)
+        finally:
+            cli.RECORDED_WARNINGS = None
+        if recipe is not None:
+            tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with tmp.open("wb") as f:
+                    pickle.dump((state, warnings, recipe), f, pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, cache_file)
+            except OSError:
+                tmp.unlink(missing_ok=True)
+        return recipe
+
+    @classmethod
+    def parse(cls, path: Path, info: component.abc.RunInfo) -> Optional["Recipe"]:
+        raw = _parse_toml(path)
+        if raw is None:
             return None
 
-        if "build" not in raw:
+        build = raw.pop("build", None)
+        if build is None:
             cli.error("Recipe file must define [build]")
             return None
 
-        build = raw.pop("build")
-
-        if "bip" in build:
-            raw_reqr = build.pop("bip")
-            reqr = version.parse_reqr(raw_reqr)
-            if reqr is None:
+        raw_reqr = build.pop("bip", None)
+        if raw_reqr is not None:
+            satisfied = version.check_reqr(raw_reqr)
+            if satisfied is None:
                 cli.warn(f"Could not parse version requirement: {raw_reqr}")
             else:
-                # print(reqr)
-                if not reqr.is_satisfied():
+                if not satisfied:
                     cli.error(
                         f"This recipe is meant for bip {raw_reqr}",
                         f"You are currently using bip {version.VERSION_STR}",
@@ -50,23 +128,27 @@ class Recipe:
         base_paths = component.Paths.from_dict(build, info)
 
         c_config = C.Config()
-        if "c" in build:
-            raw_config = build.pop("c")
+        raw_config = build.pop("c", None)
+        if raw_config is not None:
             c_config.load_overrides(raw_config)
         cpp_config = C.Config()
-        if "cpp" in build:
-            raw_config = build.pop("cpp")
+        raw_config = build.pop("cpp", None)
+        if raw_config is not None:
             cpp_config.load_overrides(raw_config)
         lang_config = lang.MultiConfig(c_config, cpp_config)
 
+        native = plat.native()
         components = []
         for cmpnt_name, raw_cmpnt in raw.items():
+            # components for other platforms are skipped before anything is
+            # built for them. unknown platforms are left to from_dict to report.
+            if isinstance(raw_cmpnt, dict) and "platform" in raw_cmpnt:
+                platcond = plat.find(raw_cmpnt["platform"])
+                if platcond is not None and platcond != native:
+                    continue
             cmpnt = component.from_dict(raw_cmpnt, cmpnt_name, base_paths, lang_config)
             if cmpnt is None:
                 return None
-            if cmpnt.platform is not None:
-                if cmpnt.platform != plat.native():
-                    continue
             components.append(cmpnt)
 
         return cls(path, components, lang_config)
@@ -1,5 +1,5 @@
-import re
-from dataclasses import dataclass
+import operator
+from dataclasses import dataclass, field
 from enum import IntEnum
 from typing import Optional
 
@@ -8,9 +8,6 @@ VERSION_NUM = (VERSION[0] << 16) | VERSION[1]
 VERSION_STR = f"{VERSION[0]}.{VERSION[1]}"
 
 
-REQR_REGEX = re.compile("^(<|<=|=|==|>=|>)?(\\d+)\\.(\\d+)(\\+)?$")
-
-
 class Comparator(IntEnum):
     LOWER = -2
     LOWER_EQUAL = -1
@@ -19,75 +16,82 @@ class Comparator(IntEnum):
     GREATER = 2
 
 
-@dataclass
+# Comparison functions for each Comparator, applied as `f(VERSION_NUM, reqr)`.
+COMPARE = {
+    Comparator.LOWER: operator.lt,
+    Comparator.LOWER_EQUAL: operator.le,
+    Comparator.EQUAL: operator.eq,
+    Comparator.GREATER_EQUAL: operator.ge,
+    Comparator.GREATER: operator.gt,
+}
+
+
+@dataclass(slots=True)
 class Reqr:
     comparator: Comparator
     major: int
     minor: int
+    # The required version packed the same way as VERSION_NUM.
+    _num: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._num = (self.major << 16) | self.minor
 
     def is_satisfied(self) -> bool:
-        match self.comparator:
-            case Comparator.LOWER:
-                if VERSION[0] >= self.major:
-                    return False
-                if VERSION[1] >= self.minor:
-                    return False
-                return True
-            case Comparator.LOWER_EQUAL:
-                if VERSION[0] > self.major:
-                    return False
-                if VERSION[1] > self.minor:
-                    return False
-                return True
-            case Comparator.EQUAL:
-                if VERSION[0] != self.major:
-                    return False
-                if VERSION[1] != self.minor:
-                    return False
-                return True
-            case Comparator.GREATER_EQUAL:
-                if VERSION[0] < self.major:
-                    return False
-                if VERSION[1] < self.minor:
-                    return False
-                return True
-            case Comparator.GREATER:
-                if VERSION[0] <= self.major:
-                    return False
-                if VERSION[1] <= self.minor:
-                    return False
-                return True
+        return COMPARE[self.comparator](VERSION_NUM, self._num)
 
 
-def parse_reqr(raw: str) -> Optional[Reqr]:
-    res = REQR_REGEX.fullmatch(raw)
-    if res is None:
-        return None
+# Comparison operators accepted in front of a version requirement.
+REQR_OPS = {
+    "<": Comparator.LOWER,
+    "<=": Comparator.LOWER_EQUAL,
+    "=": Comparator.EQUAL,
+    "==": Comparator.EQUAL,
+    ">=": Comparator.GREATER_EQUAL,
+    ">": Comparator.GREATER,
+}
+
+
+# Scan a version requirement such as `3.0+` or `>=3.1` into its comparator and
+# packed version number. The grammar, `(<|<=|=|==|>=|>)?\d+\.\d+\+?`, is
+# simple enough that it is scanned by hand rather than with a regex.
+def _scan_reqr(raw: str) -> Optional[tuple[Comparator, int, int]]:
+    rest = raw
+    comparator = REQR_OPS.get(rest[:2])
+    if comparator is not None:
+        rest = rest[2:]
+    else:
+        comparator = REQR_OPS.get(rest[:1])
+        if comparator is not None:
+            rest = rest[1:]
 
-    comparator = None
-    comp_pre = res.group(1)
-    if comp_pre is not None:
-        match comp_pre:
-            case "<":
-                comparator = Comparator.LOWER
-            case "<=":
-                comparator = Comparator.LOWER_EQUAL
-            case "=", "==":
-                comparator = Comparator.EQUAL
-            case ">=":
-                comparator = Comparator.GREATER_EQUAL
-            case ">":
-                comparator = Comparator.GREATER
-
-    comp_suffix = res.group(4)
-    if comp_suffix is not None:
+    if rest.endswith("+"):
         if comparator is not None:
             return None
         comparator = Comparator.GREATER_EQUAL
+        rest = rest[:-1]
 
     if comparator is None:
         comparator = Comparator.EQUAL
 
-    major = int(res.group(2))
-    minor = int(res.group(3))
-    return Reqr(comparator, major, minor)
+    major, dot, minor = rest.partition(".")
+    if not dot or not major.isdecimal() or not minor.isdecimal():
+        return None
+    return comparator, int(major), int(minor)
+
+
+def parse_reqr(raw: str) -> Optional[Reqr]:
+    scanned = _scan_reqr(raw)
+    if scanned is None:
+        return None
+    return Reqr(*scanned)
+
+
+# Check whether this version of bip satisfies a version requirement without
+# building a Reqr. Returns None if the requirement could not be parsed.
+def check_reqr(raw: str) -> Optional[bool]:
+    scanned = _scan_reqr(raw)
+    if scanned is None:
+        return None
+    comparator, major, minor = scanned
+    return COMPARE[comparator](VERSION_NUM, (major << 16) | minor)